@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MapsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'maps'
+
+    def ready(self):
+        from . import services
+
+        services.validate_config()
@@ -1,12 +1,18 @@
-﻿import hashlib
-import json
+﻿import functools
+import hashlib
 import os
 import re
+import zlib
 from collections import defaultdict
-from datetime import datetime
-from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import astuple, dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
 
-from django.db import connection
+import numpy as np
+import orjson
+from django.core.cache import cache
+from django.db import connection, connections
 
 IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_\\.]*$")
 
@@ -44,6 +50,16 @@ DEFAULT_FILTER_FIELDS = {
 DEFAULT_HEAT_DELTA = float(os.environ.get("MAP_HEAT_DELTA", 0.0008))  # ~90 m
 DEFAULT_QUIET_SPEED_LEVEL_ID = os.environ.get("MAP_QUIET_SPEED_LEVEL_ID", "1")
 HEAT_LIMIT = os.environ.get("MAP_HEAT_LIMIT")
+ROW_BATCH_SIZE = 1000
+HEAT_BATCH_SIZE = 10000
+ZONE_SAMPLE_SIZE = 5
+
+DISTRICTS_CACHE_KEY = "map:districts:v1"
+DISTRICTS_ETAG_KEY = "map:districts:etag"
+DISTRICTS_CACHE_TTL = int(os.environ.get("MAP_DISTRICTS_CACHE_TTL", 600))
+FILTERS_CACHE_KEY = "map:filters:v1"
+FILTERS_CACHE_TTL = int(os.environ.get("MAP_FILTERS_CACHE_TTL", 3600))
+FILTERS_PARTIAL_CACHE_TTL = int(os.environ.get("MAP_FILTERS_PARTIAL_CACHE_TTL", 60))
 
 PALETTE = [
     "#0F766E",
@@ -56,9 +72,19 @@ PALETTE = [
     "#F59E0B",
     "#6B7280",
     "#EF4444",
+    "#4F46E5",
+    "#65A30D",
+    "#0891B2",
+    "#E11D48",
+    "#C026D3",
+    "#CA8A04",
 ]
+# con 16 colores el indice sale de una mascara de bits en vez de un modulo
+PALETTE_MASK = len(PALETTE) - 1
+assert len(PALETTE) & PALETTE_MASK == 0, "PALETTE debe tener un tamaño potencia de 2"
 
 
+@functools.lru_cache(maxsize=256)
 def _safe_identifier(name: str) -> str:
     if not IDENTIFIER_RE.match(name):
         raise ValueError(f"Invalid identifier: {name}")
@@ -66,48 +92,117 @@ def _safe_identifier(name: str) -> str:
 
 
 def _color_for_key(key: str) -> str:
-    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
-    idx = int(digest, 16) % len(PALETTE)
-    return PALETTE[idx]
-
-
-def get_map_config() -> Dict[str, str]:
-    return {
-        "table": os.environ.get("MAP_TABLE", DEFAULT_MAP_CONFIG["table"]),
-        "name_field": os.environ.get("MAP_NAME_FIELD", DEFAULT_MAP_CONFIG["name_field"]),
-        "zone_field": os.environ.get("MAP_ZONE_FIELD", DEFAULT_MAP_CONFIG["zone_field"]),
-        "district_field": os.environ.get("MAP_DISTRICT_FIELD", DEFAULT_MAP_CONFIG["district_field"]),
-        "lat_field": os.environ.get("MAP_LAT_FIELD", DEFAULT_MAP_CONFIG["lat_field"]),
-        "lng_field": os.environ.get("MAP_LNG_FIELD", DEFAULT_MAP_CONFIG["lng_field"]),
-        "value_field": os.environ.get("MAP_VALUE_FIELD", DEFAULT_MAP_CONFIG["value_field"]),
-        "where": os.environ.get("MAP_WHERE_CLAUSE"),
-        "limit": int(os.environ.get("MAP_LIMIT", DEFAULT_MAP_CONFIG["limit"])),
-    }
-
-
-def get_district_config() -> Dict[str, str]:
-    return {
-        "table": os.environ.get("DISTRICT_TABLE", DEFAULT_DISTRICT_CONFIG["table"]),
-        "id_field": os.environ.get("DISTRICT_ID_FIELD", DEFAULT_DISTRICT_CONFIG["id_field"]),
-        "code_field": os.environ.get("DISTRICT_CODE_FIELD", DEFAULT_DISTRICT_CONFIG["code_field"]),
-        "name_field": os.environ.get("DISTRICT_NAME_FIELD", DEFAULT_DISTRICT_CONFIG["name_field"]),
-        "geojson_field": os.environ.get("DISTRICT_GEOJSON_FIELD", DEFAULT_DISTRICT_CONFIG["geojson_field"]),
-        "where": os.environ.get("DISTRICT_WHERE_CLAUSE"),
-    }
-
-
-def get_filter_fields() -> Dict[str, str]:
-    return {
-        "timestamp": os.environ.get("MAP_TIMESTAMP_FIELD", DEFAULT_FILTER_FIELDS["timestamp"]),
-        "moment_id": os.environ.get("MAP_MOMENT_FIELD", DEFAULT_FILTER_FIELDS["moment_id"]),
-        "altitude_level_id": os.environ.get("MAP_ALTITUDE_LEVEL_FIELD", DEFAULT_FILTER_FIELDS["altitude_level_id"]),
-        "signal_level_id": os.environ.get("MAP_SIGNAL_LEVEL_FIELD", DEFAULT_FILTER_FIELDS["signal_level_id"]),
-        "speed_level_id": os.environ.get("MAP_SPEED_LEVEL_FIELD", DEFAULT_FILTER_FIELDS["speed_level_id"]),
-        "operator_id": os.environ.get("MAP_OPERATOR_FIELD", DEFAULT_FILTER_FIELDS["operator_id"]),
-        "network_id": os.environ.get("MAP_NETWORK_FIELD", DEFAULT_FILTER_FIELDS["network_id"]),
-        "district_id": os.environ.get("MAP_DISTRICT_ID_FIELD", DEFAULT_FILTER_FIELDS["district_id"]),
-        "device_id": os.environ.get("MAP_DEVICE_FIELD", DEFAULT_FILTER_FIELDS["device_id"]),
-    }
+    return PALETTE[zlib.crc32(key.encode("utf-8")) & PALETTE_MASK]
+
+
+# los distritos son un conjunto cerrado: su color se calcula una vez por proceso
+_DISTRICT_COLORS: Dict[str, str] = {}
+
+
+def get_district_color(key: str) -> str:
+    color = _DISTRICT_COLORS.get(key)
+    if color is None:
+        color = _DISTRICT_COLORS[key] = _color_for_key(key)
+    return color
+
+
+@dataclass(frozen=True, slots=True)
+class MapConfig:
+    table: str
+    name_field: str
+    zone_field: str
+    district_field: str
+    lat_field: str
+    lng_field: str
+    value_field: str
+    where: str | None
+    limit: int
+
+
+@dataclass(frozen=True, slots=True)
+class DistrictConfig:
+    table: str
+    id_field: str
+    code_field: str
+    name_field: str
+    geojson_field: str
+    where: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class FilterFields:
+    timestamp: str
+    moment_id: str
+    altitude_level_id: str
+    signal_level_id: str
+    speed_level_id: str
+    operator_id: str
+    network_id: str
+    district_id: str
+    device_id: str
+    # columna TIME generada e indexada a partir del timestamp (opcional)
+    time_of_day: str | None
+
+
+@functools.lru_cache(maxsize=1)
+def get_map_config() -> MapConfig:
+    return MapConfig(
+        table=os.environ.get("MAP_TABLE", DEFAULT_MAP_CONFIG["table"]),
+        name_field=os.environ.get("MAP_NAME_FIELD", DEFAULT_MAP_CONFIG["name_field"]),
+        zone_field=os.environ.get("MAP_ZONE_FIELD", DEFAULT_MAP_CONFIG["zone_field"]),
+        district_field=os.environ.get("MAP_DISTRICT_FIELD", DEFAULT_MAP_CONFIG["district_field"]),
+        lat_field=os.environ.get("MAP_LAT_FIELD", DEFAULT_MAP_CONFIG["lat_field"]),
+        lng_field=os.environ.get("MAP_LNG_FIELD", DEFAULT_MAP_CONFIG["lng_field"]),
+        value_field=os.environ.get("MAP_VALUE_FIELD", DEFAULT_MAP_CONFIG["value_field"]),
+        where=os.environ.get("MAP_WHERE_CLAUSE"),
+        limit=int(os.environ.get("MAP_LIMIT", DEFAULT_MAP_CONFIG["limit"])),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_district_config() -> DistrictConfig:
+    return DistrictConfig(
+        table=os.environ.get("DISTRICT_TABLE", DEFAULT_DISTRICT_CONFIG["table"]),
+        id_field=os.environ.get("DISTRICT_ID_FIELD", DEFAULT_DISTRICT_CONFIG["id_field"]),
+        code_field=os.environ.get("DISTRICT_CODE_FIELD", DEFAULT_DISTRICT_CONFIG["code_field"]),
+        name_field=os.environ.get("DISTRICT_NAME_FIELD", DEFAULT_DISTRICT_CONFIG["name_field"]),
+        geojson_field=os.environ.get("DISTRICT_GEOJSON_FIELD", DEFAULT_DISTRICT_CONFIG["geojson_field"]),
+        where=os.environ.get("DISTRICT_WHERE_CLAUSE"),
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_filter_fields() -> FilterFields:
+    return FilterFields(
+        timestamp=os.environ.get("MAP_TIMESTAMP_FIELD", DEFAULT_FILTER_FIELDS["timestamp"]),
+        moment_id=os.environ.get("MAP_MOMENT_FIELD", DEFAULT_FILTER_FIELDS["moment_id"]),
+        altitude_level_id=os.environ.get("MAP_ALTITUDE_LEVEL_FIELD", DEFAULT_FILTER_FIELDS["altitude_level_id"]),
+        signal_level_id=os.environ.get("MAP_SIGNAL_LEVEL_FIELD", DEFAULT_FILTER_FIELDS["signal_level_id"]),
+        speed_level_id=os.environ.get("MAP_SPEED_LEVEL_FIELD", DEFAULT_FILTER_FIELDS["speed_level_id"]),
+        operator_id=os.environ.get("MAP_OPERATOR_FIELD", DEFAULT_FILTER_FIELDS["operator_id"]),
+        network_id=os.environ.get("MAP_NETWORK_FIELD", DEFAULT_FILTER_FIELDS["network_id"]),
+        district_id=os.environ.get("MAP_DISTRICT_ID_FIELD", DEFAULT_FILTER_FIELDS["district_id"]),
+        device_id=os.environ.get("MAP_DEVICE_FIELD", DEFAULT_FILTER_FIELDS["device_id"]),
+        time_of_day=os.environ.get("MAP_TIME_OF_DAY_FIELD"),
+    )
+
+
+def _as_text(column: str) -> str:
+    # las columnas de etiqueta pueden ser ids numericos; se devuelven siempre como texto
+    return f"CAST({column} AS VARCHAR)"
+
+
+def _label_or(column: str, fallback: str) -> str:
+    return f"COALESCE(NULLIF({_as_text(column)}, ''), '{fallback}')"
+
+
+def _iter_rows(cursor, batch: int = ROW_BATCH_SIZE) -> Iterator[Tuple]:
+    """Recorre el resultado por lotes con fetchmany en vez de cargarlo entero con fetchall."""
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            return
+        yield from rows
 
 
 def _build_filters(params: Dict[str, str]) -> Tuple[List[str], List]:
@@ -117,7 +212,7 @@ def _build_filters(params: Dict[str, str]) -> Tuple[List[str], List]:
 
     def add_clause(key: str, sql_op: str = "="):
         if key in params and params[key] not in (None, "", "todos", "todas"):
-            field = _safe_identifier(fields[key])
+            field = _safe_identifier(getattr(fields, key))
             clauses.append(f"{field} {sql_op} %s")
             values.append(params[key])
 
@@ -130,243 +225,380 @@ def _build_filters(params: Dict[str, str]) -> Tuple[List[str], List]:
     add_clause("district_id")
     add_clause("device_id")
 
-    # fechas
-    ts_field = _safe_identifier(fields["timestamp"])
+    # fechas: rangos sobre la columna sin envolverla en DATE() para que use el indice
+    ts_field = _safe_identifier(fields.timestamp)
     if params.get("date_from"):
-        clauses.append(f"DATE({ts_field}) >= %s")
-        values.append(params["date_from"])
+        date_from = datetime.strptime(params["date_from"], "%Y-%m-%d")
+        clauses.append(f"{ts_field} >= %s")
+        values.append(date_from.strftime("%Y-%m-%d %H:%M:%S"))
     if params.get("date_to"):
-        clauses.append(f"DATE({ts_field}) <= %s")
-        values.append(params["date_to"])
-
+        date_to = datetime.strptime(params["date_to"], "%Y-%m-%d") + timedelta(days=1)
+        clauses.append(f"{ts_field} < %s")
+        values.append(date_to.strftime("%Y-%m-%d %H:%M:%S"))
+
+    if fields.time_of_day:
+        time_field = _safe_identifier(fields.time_of_day)
+    else:
+        time_field = f"CAST({ts_field} AS time)"
     if params.get("time_from"):
-        clauses.append(f"CAST({ts_field} AS time) >= %s")
+        clauses.append(f"{time_field} >= %s")
         values.append(params["time_from"])
     if params.get("time_to"):
-        clauses.append(f"CAST({ts_field} AS time) <= %s")
+        clauses.append(f"{time_field} <= %s")
         values.append(params["time_to"])
     return clauses, values
 
 
-def fetch_dimensions(filters: Dict[str, str] | None = None) -> List[Dict]:
-    filters = filters or {}
+@functools.lru_cache(maxsize=1)
+def _dimension_columns() -> Tuple[str, Dict[str, str], Tuple[str, ...]]:
+    """Tabla, columnas validadas y clausulas WHERE fijas; solo dependen del entorno."""
     cfg = get_map_config()
     try:
-        table = _safe_identifier(cfg["table"])
-        select_fields: List[Tuple[str, str]] = [
-            ("name", _safe_identifier(cfg["name_field"])),
-            ("zone", _safe_identifier(cfg["zone_field"])),
-            ("district", _safe_identifier(cfg["district_field"])),
-            ("latitude", _safe_identifier(cfg["lat_field"])),
-            ("longitude", _safe_identifier(cfg["lng_field"])),
-            ("value", _safe_identifier(cfg["value_field"])),
-        ]
+        table = _safe_identifier(cfg.table)
+        columns = {
+            "name": _safe_identifier(cfg.name_field),
+            "zone": _safe_identifier(cfg.zone_field),
+            "district": _safe_identifier(cfg.district_field),
+            "latitude": _safe_identifier(cfg.lat_field),
+            "longitude": _safe_identifier(cfg.lng_field),
+            "value": _safe_identifier(cfg.value_field),
+        }
     except ValueError as exc:
         raise ValueError(f"ConfiguraciÃ³n invÃ¡lida de campos: {exc}") from exc
 
-    select_sql = ", ".join(f"{col} AS {alias}" for alias, col in select_fields)
-    sql = f"SELECT {select_sql} FROM {table}"
-    where_clauses = []
-    values: List = []
-    if cfg.get("where"):
-        where_clauses.append(cfg["where"])
+    base_where = []
+    if cfg.where:
+        base_where.append(f"({cfg.where})")
+    base_where.append(f"{columns['latitude']} IS NOT NULL")
+    base_where.append(f"{columns['longitude']} IS NOT NULL")
+    return table, columns, tuple(base_where)
+
 
+def _dimension_query(filters: Dict[str, str]) -> Tuple[str, Dict[str, str], str, List]:
+    table, columns, base_where = _dimension_columns()
     filter_clauses, filter_values = _build_filters(filters)
-    where_clauses.extend(filter_clauses)
+    return table, columns, " AND ".join((*base_where, *filter_clauses)), filter_values
+
+
+def _dimension_select_sql(columns: Dict[str, str], zone_sql: str | None = None) -> str:
+    return ", ".join(
+        (
+            f"{_as_text(columns['name'])} AS name",
+            f"{zone_sql or _as_text(columns['zone'])} AS zone",
+            f"{_as_text(columns['district'])} AS district",
+            f"{columns['latitude']} AS latitude",
+            f"{columns['longitude']} AS longitude",
+            f"{columns['value']} AS value",
+        )
+    )
 
-    where_clauses.append(f"{_safe_identifier(cfg['lat_field'])} IS NOT NULL")
-    where_clauses.append(f"{_safe_identifier(cfg['lng_field'])} IS NOT NULL")
 
-    if where_clauses:
-        sql += " WHERE " + " AND ".join(where_clauses)
-    if cfg.get("limit"):
-        sql += f" LIMIT {int(cfg['limit'])}"
+@functools.lru_cache(maxsize=1)
+def _dimensions_sql_template() -> Tuple[str, str]:
+    cfg = get_map_config()
+    table, columns, _ = _dimension_columns()
+    select_sql = _dimension_select_sql(columns)
+    limit_sql = f" LIMIT {cfg.limit}" if cfg.limit else ""
+    return f"SELECT {select_sql} FROM {table} WHERE ", limit_sql
 
-    with connection.cursor() as cursor:
-        cursor.execute(sql, filter_values)
-        columns = [col[0] for col in cursor.description]
-        data = [dict(zip(columns, row)) for row in cursor.fetchall()]
-
-    colors_by_district: Dict[str, str] = {}
-    for item in data:
-        district_key = item.get("district") or "Sin distrito"
-        if district_key not in colors_by_district:
-            colors_by_district[district_key] = _color_for_key(str(district_key))
-        item["color"] = colors_by_district[district_key]
-    return data
 
+def fetch_dimensions(filters: Dict[str, str] | None = None) -> List[Dict]:
+    filters = filters or {}
+    _, _, where_sql, values = _dimension_query(filters)
+    prefix, suffix = _dimensions_sql_template()
+    sql = prefix + where_sql + suffix
 
-def summarize_by_zone(dimensions: List[Dict]) -> List[Dict]:
-    grouped: Dict[str, Dict] = {}
-    for row in dimensions:
-        zone = row.get("zone") or "Sin zona"
-        district = row.get("district")
-        entry = grouped.setdefault(
-            zone,
-            {
-                "zone": zone,
-                "count": 0,
-                "districts": set(),
-                "color": _color_for_key(str(zone)),
-                "sample": [],
-            },
-        )
-        entry["count"] += 1
-        if district:
-            entry["districts"].add(district)
-        if len(entry["sample"]) < 5:
-            entry["sample"].append(
+    data: List[Dict] = []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        for name, zone, district, latitude, longitude, value in _iter_rows(cursor):
+            data.append(
                 {
-                    "name": row.get("name"),
+                    "name": name,
                     "zone": zone,
                     "district": district,
-                    "latitude": row.get("latitude"),
-                    "longitude": row.get("longitude"),
-                    "value": row.get("value"),
-                    "color": row.get("color"),
+                    "latitude": latitude,
+                    "longitude": longitude,
+                    "value": value,
+                    "color": get_district_color(district or "Sin distrito"),
                 }
             )
+    return data
+
+
+def fetch_zone_summary(filters: Dict[str, str] | None = None) -> List[Dict]:
+    """Agrega por zona en la BD y adjunta una muestra de hasta ZONE_SAMPLE_SIZE filas por zona."""
+    filters = filters or {}
+    table, columns, where_sql, values = _dimension_query(filters)
+    zone_sql = _label_or(columns["zone"], "Sin zona")
+
+    summary_sql = f"""
+    SELECT {zone_sql} AS zone,
+           COUNT(*) AS count,
+           COUNT(DISTINCT NULLIF({_as_text(columns['district'])}, '')) AS district_count
+    FROM {table}
+    WHERE {where_sql}
+    GROUP BY 1
+    """
+    sample_sql = f"""
+    SELECT name, zone, district, latitude, longitude, value
+    FROM (
+        SELECT {_dimension_select_sql(columns, zone_sql)},
+               ROW_NUMBER() OVER (PARTITION BY {zone_sql} ORDER BY {columns['name']}) AS rn
+        FROM {table}
+        WHERE {where_sql}
+    ) ranked
+    WHERE rn <= {ZONE_SAMPLE_SIZE}
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(summary_sql, values)
+        summary_rows = cursor.fetchall()
+        cursor.execute(sample_sql, values)
+        sample_rows = cursor.fetchall()
+
+    samples: Dict[str, List[Dict]] = defaultdict(list)
+    for name, zone, district, latitude, longitude, value in sample_rows:
+        samples[zone].append(
+            {
+                "name": name,
+                "zone": zone,
+                "district": district,
+                "latitude": latitude,
+                "longitude": longitude,
+                "value": value,
+                "color": get_district_color(district or "Sin distrito"),
+            }
+        )
 
     result = []
-    for zone, payload in grouped.items():
+    for zone, count, district_count in summary_rows:
         result.append(
             {
                 "zone": zone,
-                "color": payload["color"],
-                "count": payload["count"],
-                "district_count": len(payload["districts"]),
-                "sample": payload["sample"],
+                "color": _color_for_key(zone),
+                "count": count,
+                "district_count": district_count,
+                "sample": samples.get(zone, []),
             }
         )
     return sorted(result, key=lambda x: x["zone"])
 
 
-def summarize_by_district(dimensions: List[Dict]) -> List[Dict]:
-    grouped: Dict[str, Dict] = defaultdict(lambda: {"district": None, "count": 0, "color": None})
-    for row in dimensions:
-        district = row.get("district") or "Sin distrito"
-        entry = grouped[district]
-        entry["district"] = district
-        entry["count"] += 1
-        entry["color"] = entry["color"] or _color_for_key(str(district))
-    return sorted(grouped.values(), key=lambda x: x["district"])
+def fetch_district_summary(filters: Dict[str, str] | None = None) -> List[Dict]:
+    """Conteo de filas por distrito calculado con GROUP BY."""
+    filters = filters or {}
+    table, columns, where_sql, values = _dimension_query(filters)
+    district_sql = _label_or(columns["district"], "Sin distrito")
 
+    sql = f"""
+    SELECT {district_sql} AS district,
+           COUNT(*) AS count
+    FROM {table}
+    WHERE {where_sql}
+    GROUP BY 1
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, values)
+        rows = cursor.fetchall()
 
-def fetch_district_polygons() -> List[Dict]:
+    result = [{"district": district, "color": get_district_color(district), "count": count} for district, count in rows]
+    return sorted(result, key=lambda x: x["district"])
+
+
+def get_district_polygons_etag() -> str | None:
+    return cache.get(DISTRICTS_ETAG_KEY)
+
+
+@functools.lru_cache(maxsize=1)
+def _district_polygons_sql() -> str:
     cfg = get_district_config()
     try:
-        table = _safe_identifier(cfg["table"])
+        table = _safe_identifier(cfg.table)
         select_fields: List[Tuple[str, str]] = [
-            ("id", _safe_identifier(cfg["id_field"])),
-            ("code", _safe_identifier(cfg["code_field"])),
-            ("name", _safe_identifier(cfg["name_field"])),
-            ("geojson", _safe_identifier(cfg["geojson_field"])),
+            ("id", _safe_identifier(cfg.id_field)),
+            ("code", _as_text(_safe_identifier(cfg.code_field))),
+            ("name", _as_text(_safe_identifier(cfg.name_field))),
+            ("geojson", _safe_identifier(cfg.geojson_field)),
         ]
     except ValueError as exc:
         raise ValueError(f"ConfiguraciÃ³n invÃ¡lida de distritos: {exc}") from exc
 
     select_sql = ", ".join(f"{col} AS {alias}" for alias, col in select_fields)
     sql = f"SELECT {select_sql} FROM {table}"
-    if cfg.get("where"):
-        sql += f" WHERE {cfg['where']}"
+    if cfg.where:
+        sql += f" WHERE {cfg.where}"
+    # orden fijo: el ETag es un hash del resultado y no debe variar entre workers
+    sql += f" ORDER BY {_safe_identifier(cfg.id_field)}"
+    return sql
+
 
+def fetch_district_polygons() -> List[Dict]:
+    cached = cache.get(DISTRICTS_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    sql = _district_polygons_sql()
+    parsed: List[Dict] = []
     with connection.cursor() as cursor:
         cursor.execute(sql)
-        columns = [col[0] for col in cursor.description]
-        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for district_id, code, name, geojson_text in _iter_rows(cursor):
+            try:
+                data = orjson.loads(geojson_text) if geojson_text else {}
+                coordinates = data.get("coordinates") or []
+            except Exception:
+                coordinates = []
 
-    parsed: List[Dict] = []
-    for row in rows:
-        geojson_text = row.get("geojson")
-        try:
-            data = json.loads(geojson_text) if geojson_text else {}
-            coordinates = data.get("coordinates") or []
-        except Exception:
-            coordinates = []
-
-        polygons: List[List[Dict[str, float]]] = []
-        for polygon in coordinates:
-            if not polygon:
-                continue
-            outer_ring = polygon[0]
-            path = []
-            for point in outer_ring:
+            polygons: List[List[List[float]]] = []
+            for polygon in coordinates:
+                if not polygon:
+                    continue
                 try:
-                    lng, lat = float(point[0]), float(point[1])
-                    path.append({"lat": lat, "lng": lng})
-                except Exception:
+                    arr = np.asarray(polygon[0], dtype=np.float64)
+                except (TypeError, ValueError):
+                    continue
+                if arr.ndim != 2 or arr.shape[0] == 0 or arr.shape[1] < 2:
                     continue
-            if path:
-                polygons.append(path)
+                # pares [lng, lat] como en GeoJSON; se descarta la altitud si viene
+                polygons.append(arr[:, :2].tolist())
 
-        parsed.append(
-            {
-                "id": row.get("id"),
-                "code": row.get("code"),
-                "name": row.get("name"),
-                "color": _color_for_key(str(row.get("name") or row.get("code") or row.get("id"))),
-                "polygons": polygons,
-            }
-        )
+            parsed.append(
+                {
+                    "id": district_id,
+                    "code": code,
+                    "name": name,
+                    "color": get_district_color(str(name or code or district_id)),
+                    "polygons": polygons,
+                }
+            )
+
+    etag = '"' + hashlib.md5(orjson.dumps(parsed, default=str)).hexdigest() + '"'
+    cache.set_many({DISTRICTS_CACHE_KEY: parsed, DISTRICTS_ETAG_KEY: etag}, DISTRICTS_CACHE_TTL)
     return parsed
 
 
-def fetch_heatmap(filters: Dict[str, str] | None = None) -> List[Dict]:
-    """Devuelve puntos filtrados (lat/lng) respetando todos los filtros activos."""
-    filters = filters or {}
+@functools.lru_cache(maxsize=1)
+def _heatmap_sql_template() -> Tuple[str, Tuple[str, ...], str]:
     cfg = get_map_config()
     fields = get_filter_fields()
     try:
-        table = _safe_identifier(cfg["table"])
-        lat = _safe_identifier(cfg["lat_field"])
-        lng = _safe_identifier(cfg["lng_field"])
-        device = _safe_identifier(fields["device_id"])
+        table = _safe_identifier(cfg.table)
+        lat = _safe_identifier(cfg.lat_field)
+        lng = _safe_identifier(cfg.lng_field)
+        device = _safe_identifier(fields.device_id)
     except ValueError as exc:
         raise ValueError(f"Configuraci?n inv?lida de heatmap: {exc}") from exc
 
-    clauses, values = _build_filters(filters)
-    clauses.append(f"{lat} IS NOT NULL")
-    clauses.append(f"{lng} IS NOT NULL")
-    where_sql = " AND ".join(clauses) if clauses else "1=1"
-
-    sql = f"""
-    SELECT {lat} AS lat,
-           {lng} AS lng,
-           {device} AS device_id
+    # agrupa en celdas de DEFAULT_HEAT_DELTA grados; el cliente recibe una fila por celda
+    delta = repr(float(DEFAULT_HEAT_DELTA))
+    prefix = f"""
+    SELECT ROUND({lat} / {delta}) * {delta} AS lat,
+           ROUND({lng} / {delta}) * {delta} AS lng,
+           COUNT(*) AS count,
+           MAX({device}) AS device_id
     FROM {table}
-    WHERE {where_sql}
-    """
+    WHERE """
+    suffix = " GROUP BY 1, 2"
     if HEAT_LIMIT:
         try:
-            sql += f" LIMIT {int(HEAT_LIMIT)}"
+            suffix += f" LIMIT {int(HEAT_LIMIT)}"
         except Exception:
             pass
+    return prefix, (f"{lat} IS NOT NULL", f"{lng} IS NOT NULL"), suffix
 
-    with connection.cursor() as cursor:
+
+def fetch_heatmap(filters: Dict[str, str] | None = None) -> List[Dict]:
+    """Devuelve celdas del heatmap (lat/lng/conteo) respetando todos los filtros activos."""
+    filters = filters or {}
+    prefix, base_where, suffix = _heatmap_sql_template()
+    clauses, values = _build_filters(filters)
+    sql = prefix + " AND ".join((*base_where, *clauses)) + suffix
+
+    # chunked_cursor usa un cursor con nombre (server-side) en Postgres: las filas
+    # llegan por lotes en vez de quedar todas en el buffer del driver
+    with connection.chunked_cursor() as cursor:
         cursor.execute(sql, values)
-        rows = cursor.fetchall()
+        return [
+            {"lat": lat, "lng": lng, "count": count, "device_id": device_id}
+            for lat, lng, count, device_id in _iter_rows(cursor, HEAT_BATCH_SIZE)
+        ]
+
+FILTER_OPTION_TABLES = {
+    "moments": ("dim_momento", "momento_id", "momento_dia"),
+    "altitude_levels": ("dim_nivel_altitud", "nivel_altitud_id", "nivel_altitud"),
+    "signal_levels": ("dim_nivel_senal", "nivel_senal_id", "nivel_senal"),
+    "speed_levels": ("dim_nivel_velocidad", "nivel_velocidad_id", "nivel_velocidad"),
+    "operators": ("dim_operador", "operador_id", "nombre_operador"),
+    "networks": ("dim_red", "red_id", "tipo_red"),
+}
+
+
+def _filter_options_union_sql() -> str:
+    selects = [
+        f"SELECT '{key}' AS src, {_safe_identifier(id_field)} AS id, "
+        f"{_as_text(_safe_identifier(name_field))} AS name FROM {_safe_identifier(table)}"
+        for key, (table, id_field, name_field) in FILTER_OPTION_TABLES.items()
+    ]
+    return " UNION ALL ".join(selects) + " ORDER BY src, id"
+
+
+FILTER_OPTIONS_SQL = _filter_options_union_sql()
+
+
+def _fetch_filter_option_table(table: str, id_field: str, name_field: str) -> List[Dict] | None:
+    # cada hilo tiene su propia conexion de Django; se cierra al terminar para no dejarla colgada
+    db = connections["default"]
+    try:
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {_safe_identifier(id_field)}, {_as_text(_safe_identifier(name_field))} "
+                f"FROM {_safe_identifier(table)} ORDER BY 1"
+            )
+            return [{"id": r[0], "name": r[1]} for r in cursor.fetchall()]
+    except Exception:
+        return None
+    finally:
+        db.close()
+
+
+def _fetch_filter_options_per_table() -> Tuple[Dict[str, List[Dict]], bool]:
+    with ThreadPoolExecutor(max_workers=len(FILTER_OPTION_TABLES)) as executor:
+        futures = {
+            key: executor.submit(_fetch_filter_option_table, *spec) for key, spec in FILTER_OPTION_TABLES.items()
+        }
+        rows_by_key = {key: future.result() for key, future in futures.items()}
+    failed = any(rows is None for rows in rows_by_key.values())
+    return {key: rows or [] for key, rows in rows_by_key.items()}, failed
 
-    return [{"lat": row[0], "lng": row[1], "count": 1, "device_id": row[2]} for row in rows]
 
 def fetch_filter_options() -> Dict[str, List[Dict]]:
-    tables = {
-        "moments": ("dim_momento", "momento_id", "momento_dia"),
-        "altitude_levels": ("dim_nivel_altitud", "nivel_altitud_id", "nivel_altitud"),
-        "signal_levels": ("dim_nivel_senal", "nivel_senal_id", "nivel_senal"),
-        "speed_levels": ("dim_nivel_velocidad", "nivel_velocidad_id", "nivel_velocidad"),
-        "operators": ("dim_operador", "operador_id", "nombre_operador"),
-        "networks": ("dim_red", "red_id", "tipo_red"),
-    }
-    result: Dict[str, List[Dict]] = {}
-    with connection.cursor() as cursor:
-        for key, (table, id_field, name_field) in tables.items():
-            try:
-                cursor.execute(
-                    f"SELECT {_safe_identifier(id_field)}, {_safe_identifier(name_field)} FROM {_safe_identifier(table)} ORDER BY 1"
-                )
-                rows = cursor.fetchall()
-                result[key] = [{"id": r[0], "name": r[1]} for r in rows]
-            except Exception:
-                result[key] = []
+    cached = cache.get(FILTERS_CACHE_KEY)
+    if cached is not None:
+        return cached
+
+    result: Dict[str, List[Dict]] = {key: [] for key in FILTER_OPTION_TABLES}
+    failed = False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(FILTER_OPTIONS_SQL)
+            for src, option_id, name in _iter_rows(cursor):
+                result[src].append({"id": option_id, "name": name})
+    except Exception:
+        # si falta alguna tabla la union completa falla; se consulta tabla por tabla en paralelo
+        result, failed = _fetch_filter_options_per_table()
+
+    # una respuesta parcial se cachea poco tiempo: el fallo suele persistir y asi no se repite
+    # la union fallida + el fallback en cada peticion, pero tampoco queda fijado una hora
+    cache.set(FILTERS_CACHE_KEY, result, FILTERS_PARTIAL_CACHE_TTL if failed else FILTERS_CACHE_TTL)
     return result
 
+
+def validate_config() -> None:
+    """Valida al arrancar los identificadores que vienen del entorno (falla antes de servir peticiones)."""
+    _dimension_columns()
+    _dimensions_sql_template()
+    _district_polygons_sql()
+    _heatmap_sql_template()
+    for field in astuple(get_filter_fields()):
+        if field:
+            _safe_identifier(field)
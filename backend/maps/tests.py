@@ -1,3 +1,140 @@
-from django.test import TestCase
+from dataclasses import replace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from . import services
+
+DEFAULT_FIELDS = services.FilterFields(**services.DEFAULT_FILTER_FIELDS, time_of_day=None)
+
+
+class BuildFiltersDateTests(SimpleTestCase):
+    def build(self, params, fields=DEFAULT_FIELDS):
+        with mock.patch.object(services, "get_filter_fields", return_value=fields):
+            return services._build_filters(params)
+
+    def test_date_range_uses_plain_timestamp_bounds(self):
+        clauses, values = self.build({"date_from": "2024-03-10", "date_to": "2024-03-12"})
+        self.assertEqual(clauses, ["timestamp >= %s", "timestamp < %s"])
+        self.assertEqual(values, ["2024-03-10 00:00:00", "2024-03-13 00:00:00"])
+
+    def test_date_to_rolls_over_end_of_month_and_year(self):
+        _, values = self.build({"date_to": "2024-02-29"})
+        self.assertEqual(values, ["2024-03-01 00:00:00"])
+        _, values = self.build({"date_to": "2024-12-31"})
+        self.assertEqual(values, ["2025-01-01 00:00:00"])
+
+    def test_invalid_date_raises(self):
+        for bad in ("2024-13-01", "10/03/2024", "2024-03-10 08:00"):
+            with self.assertRaises(ValueError):
+                self.build({"date_from": bad})
+
+    def test_time_filters_cast_timestamp_by_default(self):
+        clauses, values = self.build({"time_from": "08:00", "time_to": "18:30"})
+        self.assertEqual(
+            clauses,
+            ["CAST(timestamp AS time) >= %s", "CAST(timestamp AS time) <= %s"],
+        )
+        self.assertEqual(values, ["08:00", "18:30"])
+
+    def test_time_filters_use_time_of_day_column_when_configured(self):
+        fields = replace(DEFAULT_FIELDS, time_of_day="hora")
+        clauses, _ = self.build({"time_from": "08:00", "time_to": "18:30"}, fields)
+        self.assertEqual(clauses, ["hora >= %s", "hora <= %s"])
+
+    def test_invalid_date_returns_400(self):
+        response = self.client.get("/api/dimensions/", {"date_to": "bad"})
+        self.assertEqual(response.status_code, 400)
+
+
+class SummaryQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cfg = services.get_map_config()
+        rows = [
+            ("a", "z1", "d1"),
+            ("b", "z1", "d2"),
+            ("c", "z1", "d2"),
+            ("d", "z1", "d3"),
+            ("e", "z1", "d3"),
+            ("f", "z1", "d1"),
+            ("g", "z1", None),
+            ("h", None, "d1"),
+            ("i", "", ""),
+            ("j", None, None),
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {cfg.table} ({cfg.name_field} TEXT, {cfg.zone_field} TEXT, "
+                f"{cfg.district_field} TEXT, {cfg.lat_field} REAL, {cfg.lng_field} REAL, {cfg.value_field} REAL)"
+            )
+            cursor.executemany(
+                f"INSERT INTO {cfg.table} VALUES (%s, %s, %s, %s, %s, %s)",
+                [(name, zone, district, -17.78, -63.18, 1.0) for name, zone, district in rows],
+            )
+
+    def test_zone_summary_merges_null_and_empty_zones(self):
+        zones = {entry["zone"]: entry for entry in services.fetch_zone_summary()}
+        self.assertEqual(sorted(zones), ["Sin zona", "z1"])
+        self.assertEqual(zones["Sin zona"]["count"], 3)
+        self.assertEqual(zones["z1"]["count"], 7)
+
+    def test_district_count_ignores_null_and_empty_districts(self):
+        zones = {entry["zone"]: entry for entry in services.fetch_zone_summary()}
+        self.assertEqual(zones["z1"]["district_count"], 3)
+        self.assertEqual(zones["Sin zona"]["district_count"], 1)
+
+    def test_zone_sample_is_bounded_and_labelled(self):
+        for entry in services.fetch_zone_summary():
+            self.assertLessEqual(len(entry["sample"]), services.ZONE_SAMPLE_SIZE)
+            self.assertTrue(entry["sample"])
+            for row in entry["sample"]:
+                self.assertEqual(row["zone"], entry["zone"])
+        zones = {entry["zone"]: entry for entry in services.fetch_zone_summary()}
+        self.assertEqual(len(zones["z1"]["sample"]), services.ZONE_SAMPLE_SIZE)
+
+    def test_district_summary_merges_null_and_empty_districts(self):
+        districts = {entry["district"]: entry["count"] for entry in services.fetch_district_summary()}
+        self.assertEqual(districts, {"Sin distrito": 3, "d1": 3, "d2": 2, "d3": 2})
+
+
+class DistrictPolygonsEtagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cfg = services.get_district_config()
+        geojson = '{"type": "MultiPolygon", "coordinates": [[[[-63.1, -17.7], [-63.2, -17.8], [-63.3, -17.7]]]]}'
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {cfg.table} ({cfg.id_field} INTEGER, {cfg.code_field} TEXT, "
+                f"{cfg.name_field} TEXT, {cfg.geojson_field} TEXT)"
+            )
+            cursor.executemany(
+                f"INSERT INTO {cfg.table} VALUES (%s, %s, %s, %s)",
+                [(2, "C2", "Sur", geojson), (1, "C1", "Norte", geojson)],
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_polygons_are_ordered_by_id(self):
+        self.assertEqual([d["id"] for d in services.fetch_district_polygons()], [1, 2])
+
+    def test_matching_if_none_match_returns_304(self):
+        first = self.client.get("/api/district-polygons/")
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers.get("ETag")
+        self.assertTrue(etag)
+
+        second = self.client.get("/api/district-polygons/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b"")
+        self.assertEqual(second.headers.get("ETag"), etag)
+
+    def test_stale_if_none_match_returns_payload(self):
+        self.client.get("/api/district-polygons/")
+        response = self.client.get("/api/district-polygons/", HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 2)
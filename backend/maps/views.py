@@ -4,14 +4,6 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from . import services
-from .serializers import (
-    DimensionSerializer,
-    DistrictPolygonSerializer,
-    DistrictSerializer,
-    FilterSetsSerializer,
-    HeatPointSerializer,
-    ZoneSerializer,
-)
 
 
 @api_view(["GET"])
@@ -26,42 +18,40 @@ class DimensionListView(APIView):
             items = services.fetch_dimensions(filters)
         except Exception as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = DimensionSerializer(items, many=True)
-        return Response({"data": serializer.data})
+        return Response({"data": items})
 
 
 class ZoneSummaryView(APIView):
     def get(self, request):
         filters = request.query_params.dict()
         try:
-            items = services.fetch_dimensions(filters)
-            payload = services.summarize_by_zone(items)
+            payload = services.fetch_zone_summary(filters)
         except Exception as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = ZoneSerializer(payload, many=True)
-        return Response({"data": serializer.data})
+        return Response({"data": payload})
 
 
 class DistrictSummaryView(APIView):
     def get(self, request):
         filters = request.query_params.dict()
         try:
-            items = services.fetch_dimensions(filters)
-            payload = services.summarize_by_district(items)
+            payload = services.fetch_district_summary(filters)
         except Exception as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = DistrictSerializer(payload, many=True)
-        return Response({"data": serializer.data})
+        return Response({"data": payload})
 
 
 class DistrictPolygonsView(APIView):
     def get(self, request):
+        etag = services.get_district_polygons_etag()
+        if etag and request.headers.get("If-None-Match") == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
         try:
             payload = services.fetch_district_polygons()
         except Exception as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = DistrictPolygonSerializer(payload, many=True)
-        return Response({"data": serializer.data})
+        etag = services.get_district_polygons_etag()
+        return Response({"data": payload}, headers={"ETag": etag} if etag else None)
 
 
 class HeatmapView(APIView):
@@ -71,12 +61,10 @@ class HeatmapView(APIView):
             payload = services.fetch_heatmap(filters)
         except Exception as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        serializer = HeatPointSerializer(payload, many=True)
-        return Response({"data": serializer.data})
+        return Response({"data": payload})
 
 
 class FilterOptionsView(APIView):
     def get(self, _request):
         data = services.fetch_filter_options()
-        serializer = FilterSetsSerializer(data)
-        return Response({"data": serializer.data})
+        return Response({"data": data})
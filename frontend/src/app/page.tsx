@@ -32,7 +32,7 @@ type DistrictPolygon = {
   code: string;
   name: string;
   color: string;
-  polygons: { lat: number; lng: number }[][];
+  polygons: [number, number][][];
 };
 
 type HeatPoint = {
@@ -93,8 +93,8 @@ function qs(filters: Filters) {
   return params.toString();
 }
 
-async function fetcher<T>(path: string): Promise<T> {
-  const res = await fetch(`${API_BASE}${path}`, { cache: "no-store" });
+async function fetcher<T>(path: string, cache: RequestCache = "no-store"): Promise<T> {
+  const res = await fetch(`${API_BASE}${path}`, { cache });
   if (!res.ok) {
     throw new Error(`API ${path} devolvió ${res.status}`);
   }
@@ -143,7 +143,8 @@ export default function Home() {
           fetcher<Dimension[]>(`/dimensions/${query ? "?" + query : ""}`),
           fetcher<ZoneSummary[]>(`/zones/${query ? "?" + query : ""}`),
           fetcher<DistrictSummary[]>(`/districts/${query ? "?" + query : ""}`),
-          fetcher<DistrictPolygon[]>("/district-polygons/"),
+          // "no-cache" guarda la respuesta y la revalida con If-None-Match (304 si no cambió)
+          fetcher<DistrictPolygon[]>("/district-polygons/", "no-cache"),
           fetcher<HeatPoint[]>(`/heatmap/${query ? "?" + query : ""}`),
         ]);
 
@@ -172,12 +173,18 @@ export default function Home() {
     return dimensions.filter((item) => item.latitude && item.longitude);
   }, [dimensions]);
 
+  // la API envía pares [lng, lat]; se convierten a LatLngLiteral una sola vez por carga
+  const districtPaths = useMemo(
+    () => districtPolygons.map((d) => d.polygons.map((poly) => poly.map(([lng, lat]) => ({ lat, lng })))),
+    [districtPolygons]
+  );
+
   const districtOptions = useMemo(() => districtPolygons.map((d) => ({ id: d.id, name: d.name })), [districtPolygons]);
 
   const mapCenter = useMemo(() => {
     if (districtPolygons.length && districtPolygons[0].polygons.length) {
-      const pt = districtPolygons[0].polygons[0][0];
-      return { lat: pt.lat, lng: pt.lng };
+      const [lng, lat] = districtPolygons[0].polygons[0][0];
+      return { lat, lng };
     }
     if (filteredDimensions.length) {
       return {
@@ -355,13 +362,13 @@ export default function Home() {
                     styles: mapStyle,
                   }}
                 >
-                  {districtPolygons.map((district) =>
-                    district.polygons.map((poly, idx) => {
+                  {districtPolygons.map((district, districtIdx) =>
+                    districtPaths[districtIdx].map((path, idx) => {
                       const selected = !filters.district_id || String(district.id) === filters.district_id;
                       return (
                         <Polygon
                           key={`${district.id}-${idx}`}
-                          path={poly}
+                          path={path}
                           options={{
                             fillColor: district.color,
                             fillOpacity: selected ? 0.25 : 0.08,
@@ -411,7 +418,7 @@ export default function Home() {
             <div className="space-y-3 max-h-[540px] overflow-y-auto pr-1">
               {(districtLegend.length
                 ? districtLegend
-                : districtOptions.map((name, idx) => ({ id: idx, name: name.name, color: "#22C55E", count: 0, polygons: [] as {lat:number;lng:number}[][] }))
+                : districtOptions.map((name, idx) => ({ id: idx, name: name.name, color: "#22C55E", count: 0, polygons: [] as [number, number][][] }))
               ).map((district) => (
                 <div
                   key={district.id ?? district.name}